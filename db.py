@@ -0,0 +1,125 @@
+"""
+This module provides the shared database connection helper for the Music Library Management System.
+The main.py, login.py and records.py scripts open the SQLite database through open_db() so every connection is tuned the same way.
+The get_conn() function opens a connection the first time it is called in a thread and returns that same connection afterwards, so the scripts do not reopen the database for every query.
+The ensure_schema() function upgrades tables created by earlier versions of the scripts, whichever script opens the database first.
+The get_ro_conn() function lends out read-only connections from a small pool, so queries which only read do not wait behind writes.
+"""
+
+import atexit        # Atexit library for closing the shared connection when the script ends
+import contextlib    # Contextlib library for lending out pooled connections with a with statement
+import os            # Os library for reading the number of CPU cores, which sets the pool size
+import queue         # Queue library for the thread safe pool of read-only connections
+import sqlite3       # SQLite library for database operations
+import threading     # Threading library for keeping one connection per thread
+
+# Below is the name of the SQLite database file shared by all the scripts
+DATABASE = 'music_library.db'
+
+# Below is a function to open a connection to the database and apply the performance settings
+# WAL journaling lets readers continue while a write is in progress, and synchronous=NORMAL avoids an fsync on every commit
+# The busy timeout makes the connection wait up to 5 seconds for a lock instead of failing straight away
+# A negative cache size is given in KiB (about 64 MB), and temporary tables and indexes are kept in memory
+# Up to 256 MB of the database file is memory-mapped, so pages are read without copying them through a read() call
+# Foreign keys are enforced so a user cannot point at an account that does not exist
+# Up to 256 prepared statements are cached per connection, so the fixed queries used by the scripts are only compiled once
+# PRAGMA settings only apply to the connection they are run on, so they are executed every time a connection is opened
+def open_db():
+    conn = sqlite3.connect(DATABASE, cached_statements=256)
+    conn.executescript('''
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA busy_timeout=5000;
+    PRAGMA cache_size=-64000;
+    PRAGMA temp_store=memory;
+    PRAGMA mmap_size=268435456;
+    PRAGMA foreign_keys=ON;
+    ''')
+    return conn
+
+# Below is the version of the database layout the scripts expect, which is stored in the database file with PRAGMA user_version
+_SCHEMA_VERSION = 1
+
+# Below is a function to upgrade a database created by an earlier version of the scripts, run by get_conn() on every new connection
+# It only reads user_version when the database is already up to date, so the check costs almost nothing
+# Otherwise the upgrade runs in one write transaction, and user_version is checked again once the lock is held in case another script upgraded it first
+# Version 1 adds the hash_algorithm column to the users table, and existing accounts keep the 'pbkdf2_sha256' default until their next login rehashes them
+# Version 1 also converts checksums stored as hexadecimal text into the raw 32-byte digest
+# SQLite does not change the type of a BLOB stored in a TEXT column, so the checksum column itself does not need to be rebuilt
+# Tables which do not exist yet are skipped, as main.py creates them with the current layout
+def ensure_schema(conn):
+    if conn.execute('PRAGMA user_version').fetchone()[0] >= _SCHEMA_VERSION:
+        return
+    conn.execute('BEGIN IMMEDIATE')
+    with conn:
+        if conn.execute('PRAGMA user_version').fetchone()[0] >= _SCHEMA_VERSION:
+            return
+        columns = [column[1] for column in conn.execute('PRAGMA table_info(users)')]
+        if columns and 'hash_algorithm' not in columns:
+            conn.execute("ALTER TABLE users ADD COLUMN hash_algorithm TEXT NOT NULL DEFAULT 'pbkdf2_sha256'")
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'musical_recordings'").fetchone():
+            rows = conn.execute("SELECT id, checksum FROM musical_recordings WHERE typeof(checksum) = 'text'").fetchall()
+            conn.executemany('UPDATE musical_recordings SET checksum = ? WHERE id = ?',
+                             [(bytes.fromhex(checksum), record_id) for record_id, checksum in rows])
+        conn.execute(f'PRAGMA user_version = {_SCHEMA_VERSION}')
+
+# Below holds the read/write connection of each thread, which is only opened when get_conn() is first called in that thread
+_local = threading.local()
+
+# Below is a function which returns the read/write connection shared by every module running in the current thread
+# Nothing is opened when a module is imported; the database is opened on the first call and the same connection is returned afterwards
+# A newly opened connection first runs ensure_schema(), so login.py and records.py also work on a database created by an earlier version
+# Each thread gets its own connection, so a connection is never used by two threads at once
+def get_conn():
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = _local.conn = open_db()
+        ensure_schema(conn)
+    return conn
+
+# Below is a function to close the current thread's connection, which is also run automatically when the script ends
+# PRAGMA optimize is run first so SQLite can refresh the statistics the query planner uses as the library grows
+# Nothing happens if the connection was never opened or has already been closed
+def close_conn():
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.execute('PRAGMA optimize')
+        conn.close()
+        _local.conn = None
+
+atexit.register(close_conn)
+
+# Below is a function to open a read-only connection to the database
+# The database is opened through a URI with mode=ro, so SQLite itself refuses any write made on this connection
+# The journal mode is not set here because a read-only connection cannot change it, and WAL is already stored in the database file
+# check_same_thread is turned off because a pooled connection may be handed to a different thread each time it is borrowed
+def open_ro_db():
+    conn = sqlite3.connect(f'file:{DATABASE}?mode=ro', uri=True, check_same_thread=False, cached_statements=256)
+    conn.executescript('''
+    PRAGMA busy_timeout=5000;
+    PRAGMA cache_size=-64000;
+    PRAGMA temp_store=memory;
+    PRAGMA mmap_size=268435456;
+    ''')
+    return conn
+
+# Below is the pool of read-only connections, which holds at most one connection per CPU core
+_ro_pool = queue.Queue(maxsize=os.cpu_count() or 1)
+
+# Below is a function which lends out a read-only connection for the length of a with statement
+# A connection is taken from the pool, or opened if the pool is empty, and given back to the pool afterwards
+# If the pool is already full when the connection is given back, the connection is closed instead
+# With WAL journaling these readers see the last committed data and do not block, or get blocked by, the read/write connection
+@contextlib.contextmanager
+def get_ro_conn():
+    try:
+        conn = _ro_pool.get_nowait()
+    except queue.Empty:
+        conn = open_ro_db()
+    try:
+        yield conn
+    finally:
+        try:
+            _ro_pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
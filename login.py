@@ -5,54 +5,119 @@ The 'user' role can view the library, while the 'admin' role can perform CRUD op
 The module connects to an SQLite database to store user accounts and library data, which is encrypted for security.
 """
 
-import sqlite3       # Import the SQLite3 module to connect to the SQLite database
 import hashlib       # Import the hashlib module to hash the password for security purposes
+import hmac          # Import the hmac module to compare password hashes in constant time
+import os            # Import the os module to generate a random salt when rehashing a password
+import itertools     # Import the itertools module to group the combined query rows by table
+from operator import itemgetter  # Import itemgetter to read the table name at the start of each row
+from db import get_conn, get_ro_conn  # Import the shared SQLite database connection and the read-only connection pool
 
-# Below will connect to the SQLite database and create a cursor object to execute SQL queries
-conn = sqlite3.connect('music_library.db')
-cursor = conn.cursor()
+# The optional fastpbkdf2 package reuses the HMAC inner/outer contexts across PBKDF2 rounds, which is faster than hashlib
+try:
+    from fastpbkdf2 import pbkdf2_hmac
+except ImportError:
+    from hashlib import pbkdf2_hmac
 
 # For the purpose of executing this login.py script, output will prompt the user to enter username and password
 # These accounts and their credentials were registered in the main.py script after running the script
 # When the user enters the correct username and password, the user will be authenticated and granted access to the library
 # The account details are stored in the users table in the database
 
+# Below is the query used to look up a user's credentials when they log in
+# Keeping the SQL text in one constant means sqlite3's statement cache reuses the prepared statement on every login
+# The UNIQUE constraint on username already gives SQLite an index to search, so no extra index is needed
+# LIMIT 1 tells SQLite it can stop as soon as the matching row is found
+_AUTH_SQL = 'SELECT password_hash, salt, role, hash_algorithm FROM users WHERE username = ? LIMIT 1'
+
+# Below is a fixed salt used to hash the password when the username does not exist
+# The failed login then takes as long as a wrong password for a real user, so the time taken does not reveal which usernames exist
+_DUMMY_SALT = b'music-library-no-such-user'
+
 # Below will get the user credentials from the database
+# The shared connection from get_conn() is used, so the database is only opened once per process
 def get_user_credentials(username):
-    cursor.execute('SELECT password_hash, salt, role FROM users WHERE username = ?', (username,))
-    return cursor.fetchone()
+    return get_conn().execute(_AUTH_SQL, (username,)).fetchone()
 
 # Below will hash the password for security purposes
-def hash_password(password, salt):
-    return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, 100000)
+# New passwords are hashed with scrypt; PBKDF2-SHA256 is only kept to verify accounts created before the switch
+# The password is passed in as bytes, as authenticate_user encodes it once and reuses it for the check and any rehash
+def hash_password(password, salt, algorithm='scrypt'):
+    if algorithm == 'pbkdf2_sha256':
+        return pbkdf2_hmac('sha256', password, salt, 100000)
+    return hashlib.scrypt(password, salt=salt, n=2**14, r=8, p=1, dklen=32)
+
+# Below will rehash the password with scrypt and a fresh salt for accounts still using the older PBKDF2 hash
+def upgrade_password_hash(username, password):
+    salt = os.urandom(16)
+    conn = get_conn()
+    conn.execute('UPDATE users SET password_hash = ?, salt = ?, hash_algorithm = ? WHERE username = ?',
+                 (hash_password(password, salt), salt, 'scrypt', username))
+    conn.commit()
 
 # Below will authenticate the user based on the username and password entered
+# An empty username or password is rejected straight away, without querying the database or hashing anything
 def authenticate_user(username, password):
+    if not username or not password:
+        return None
     user = get_user_credentials(username)
+    pwd_bytes = password.encode('utf-8')
 
 # If the user is in the database, the password will be hashed  
 # The hashed password will be compared with the stored hash in the database
     if user:
-        stored_hash, salt, role = user
-        test_hash = hash_password(password, salt) 
+        stored_hash, salt, role, algorithm = user
+        test_hash = hash_password(pwd_bytes, salt, algorithm) 
 
 # If the hashed password matches the stored hash, the user will be authenticated and granted access to the library                                                     
-        if test_hash == stored_hash:
+# The hashes are compared with hmac.compare_digest, which takes the same time however many bytes match
+# sqlite3 returns the password_hash BLOB as bytes, so both sides are already bytes and no conversion is needed before comparing
+        if hmac.compare_digest(test_hash, stored_hash):
+            if algorithm != 'scrypt':
+                upgrade_password_hash(username, pwd_bytes)
             return role                           
+
+# If the user is not in the database, the password is still hashed with the fixed salt and the result is thrown away
+    else:
+        hash_password(pwd_bytes, _DUMMY_SALT)
     
     return None
 
+# Below is the query used by view_data, which reads all four tables in one statement with UNION ALL
+# Each row starts with the name of its table, and shorter rows are padded with NULL so every part has the same number of columns
+# The score and recording BLOBs are replaced by their size in bytes, and _VIEW_ALL_BLOBS_SQL is the same query with the BLOBs kept
+# The checksum is stored as raw bytes, so SQLite turns it into lowercase hexadecimal for display
+_VIEW_SQL = """
+SELECT 'lyrics', id, song_title, lyrics, timestamp, NULL FROM lyrics
+UNION ALL SELECT 'music_scores', id, song_title, {score}, timestamp, NULL FROM music_scores
+UNION ALL SELECT 'musical_recordings', id, song_title, {recording}, lower(hex(checksum)), timestamp FROM musical_recordings
+UNION ALL SELECT 'modification_history', id, table_name, action, record_id, timestamp FROM modification_history
+"""
+_VIEW_ALL_SQL = _VIEW_SQL.format(score='length(score)', recording='length(recording)')
+_VIEW_ALL_BLOBS_SQL = _VIEW_SQL.format(score='score', recording='recording')
+
+# Below is the number of columns each table has in the combined query, used to remove the NULL padding before printing
+_VIEW_COLUMNS = {'lyrics': 4, 'music_scores': 4, 'musical_recordings': 5, 'modification_history': 5}
+
 # Below will view the data based on the user's role 
 # Based on the role, the data will be pulled from the lyrics, music_scores, musical_recordings, and modification_history tables
-# The cursor will execute the SQL query to select all the data from the tables
-def view_data(role):
+# A read-only connection from the pool will execute the combined SQL query to select the data from every table at once
+# The score and recording BLOBs are shown as their size in bytes unless include_blobs is True, so they are not read just to be printed
+# The rows are grouped by their table name with itertools.groupby as the cursor steps through them, without a fetchall() first
+# The heading of each table is printed even when the table is empty and has no rows in the result
+def view_data(role, include_blobs=False):
     if role:
-        tables = ['lyrics', 'music_scores', 'musical_recordings', 'modification_history']
+        tables = iter(_VIEW_COLUMNS)
+        with get_ro_conn() as ro_conn:
+            rows = ro_conn.execute(_VIEW_ALL_BLOBS_SQL if include_blobs else _VIEW_ALL_SQL)
+            for tag, group in itertools.groupby(rows, key=itemgetter(0)):
+                for table in tables:
+                    print(f"{table.replace('_', ' ').title()}:")
+                    if table == tag:
+                        break
+                for row in group:
+                    print(row[1:_VIEW_COLUMNS[tag] + 1])
         for table in tables:
-            cursor.execute(f'SELECT * FROM {table}')
             print(f"{table.replace('_', ' ').title()}:")
-            for row in cursor.fetchall():
-                print(row)
     else:
         print("Permission denied: Invalid username or password.")
 
@@ -103,6 +168,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
-# This will commit any changes to the database
-conn.commit()
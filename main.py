@@ -3,13 +3,15 @@ This module contains code for creating and managing a music library database.
 The module includes functions and classes for creating tables, inserting records, and performing authentication and authorization.
 """
 
-import sqlite3                 # SQLite library for database operations
+import atexit                  # Atexit library for logging any buffered modification history when the script ends
 import hashlib                 # Hashlib library for hashing functions
 import os                      # Os library for operating system functions such as random number generation (salt)
-from datetime import datetime  # Datetime library for timestamping records
+from concurrent.futures import ThreadPoolExecutor  # Thread pool for hashing several recordings at the same time
+from db import get_conn, get_ro_conn  # Shared SQLite database connection and read-only connection pool
+import login                   # Password hashing and authentication shared with login.py and records.py
 
 # Below connects to the SQLite database and creates a cursor object to execute SQL queries
-conn = sqlite3.connect('music_library.db')
+conn = get_conn()
 cursor = conn.cursor()
 
 # The beginning of this script is the creation of the database and tables for storing data
@@ -22,13 +24,14 @@ cursor = conn.cursor()
 # The table will store the song title, recording (BLOB), checksum, and timestamp of the record
 # Blob is a binary large object that can store large data such as images, audio, and video files
 # The checksum is a hash value generated from the recording data to ensure data integrity
+# The checksum is stored as the raw 32-byte SHA-256 digest in a BLOB, which is half the size of the same digest written out in hexadecimal
 # This will be applied to all tables in the database to ensure data integrity
 cursor.execute('''
 CREATE TABLE IF NOT EXISTS musical_recordings (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     song_title TEXT NOT NULL,
     recording BLOB NOT NULL,
-    checksum TEXT NOT NULL,
+    checksum BLOB NOT NULL,
     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
 )
 ''')
@@ -76,6 +79,17 @@ CREATE TABLE IF NOT EXISTS modification_history (
 )
 ''')
 
+# Below creates an index on the table name and record ID of the modification history
+# This lets list_songs_with_history find the history of one table with an index search instead of scanning every row
+cursor.execute('CREATE INDEX IF NOT EXISTS idx_modhist_table_record ON modification_history(table_name, record_id)')
+
+# Below creates an index on the song title of the lyrics, music scores and musical recordings tables
+# The records.py script deletes artifacts by song title, so each delete is an index search instead of a scan of the whole table
+# The username in the users table does not need one, as its UNIQUE constraint already gives SQLite an index on it
+cursor.execute('CREATE INDEX IF NOT EXISTS idx_lyrics_song_title ON lyrics(song_title)')
+cursor.execute('CREATE INDEX IF NOT EXISTS idx_music_scores_song_title ON music_scores(song_title)')
+cursor.execute('CREATE INDEX IF NOT EXISTS idx_musical_recordings_song_title ON musical_recordings(song_title)')
+
 # Below creates a table for storing user accounts for authentication and authorization purposes in the database
 # The table will store the account ID, first name, last name, date of birth, email, and timestamp of the record
 # The account ID will be used as a foreign key in the users table to link the user account with the user details
@@ -98,19 +112,24 @@ CREATE TABLE IF NOT EXISTS accounts (
 # The account ID will be used as a foreign key in the users table to link the user account with the user details
 # The username will be used as a unique identifier for the user account
 # The role will be used to determine the role of the user (user or admin)
+# The password hash and salt are raw bytes, so they are declared as BLOB columns rather than TEXT
+# The hash algorithm records which algorithm produced the password hash (scrypt, or pbkdf2_sha256 for older accounts)
 cursor.execute('''
 CREATE TABLE IF NOT EXISTS users (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     account_id INTEGER NOT NULL,
     username TEXT NOT NULL UNIQUE,
-    password_hash TEXT NOT NULL,
-    salt TEXT NOT NULL,
+    password_hash BLOB NOT NULL,
+    salt BLOB NOT NULL,
     role TEXT NOT NULL CHECK(role IN ('user', 'admin')),
+    hash_algorithm TEXT NOT NULL DEFAULT 'pbkdf2_sha256',
     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (account_id) REFERENCES accounts (id)
 )
 ''')
 
+# Tables created by earlier versions of the scripts are upgraded by ensure_schema() in db.py, which get_conn() runs for every script
+
 # Below commits the changes to the database
 # The commit method is used to save the changes to the database 
 conn.commit()
@@ -136,91 +155,143 @@ class Account:
 # Static method is applied to the class login to show the use of static methods in Python 
 # Static method is a method that is bound to the class rather than the object of the class
 # Static method is convenient because it doesnt require the creation of an instance of the class as its bound to the Login class itself
+# The hashing and authentication themselves are done by login.py, so there is only one copy of the login code to maintain
 class Login:
     @staticmethod
-    def hash_password(password, salt=None, iterations=100000):        # The hash_password method will hash the user's password
+    def hash_password(password, salt=None, algorithm='scrypt'):      # The hash_password method will hash the user's password (as bytes)
         if salt is None:                                              # The method will take the password and salt as input
             salt = os.urandom(16)                                     # The method will generate a random salt if no salt is provided
-        password_hash = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)  
-        return password_hash, salt                                    # The method will return the password hash and salt
+        return login.hash_password(password, salt, algorithm), salt  # The method will return the password hash and salt
 
     @staticmethod
     def add_user(account_id, username, password, role):
-        password_hash, salt = Login.hash_password(password)
-        cursor.execute('INSERT INTO users (account_id, username, password_hash, salt, role) VALUES (?, ?, ?, ?, ?)',
-                       (account_id, username, password_hash, salt, role))
+        password_hash, salt = Login.hash_password(password.encode('utf-8'))
+        cursor.execute('INSERT INTO users (account_id, username, password_hash, salt, role, hash_algorithm) VALUES (?, ?, ?, ?, ?, ?)',
+                       (account_id, username, password_hash, salt, role, 'scrypt'))
         conn.commit()
 
+# The authenticate_user method returns the role of the user if the username and password are correct, or None otherwise
     @staticmethod
     def authenticate_user(username, password):
-        cursor.execute('SELECT password_hash, salt, role FROM users WHERE username = ?', (username,))
-        user = cursor.fetchone()
-        if user:
-            password_hash, salt, role = user
-            test_hash, _ = Login.hash_password(password, salt)
-            if test_hash == password_hash:
-                return role  # This will return the role of the user if authentication is successful
-        return None
+        return login.authenticate_user(username, password)
 
 # Below is a function to compute the checksum of a data record 
 # The function will take the data as input and compute the SHA-256 hash of the data
-# The function will return the checksum of the data as a hexadecimal string
+# The function will return the checksum of the data as the raw 32-byte digest, which is what the checksum column stores
 # This is to ensure data integrity and prevent data tampering in the database
+# The data can also be a file opened in binary mode, which is hashed as it is read instead of being loaded into memory first
+# hashlib.file_digest is used for files on Python 3.11+, and the file is read in 64 KiB chunks on older versions
 def compute_checksum(data):
-    return hashlib.sha256(data).hexdigest()
+    if not hasattr(data, 'read'):
+        return hashlib.sha256(data).digest()
+    if hasattr(hashlib, 'file_digest'):
+        return hashlib.file_digest(data, 'sha256').digest()
+    checksum = hashlib.sha256()
+    for chunk in iter(lambda: data.read(65536), b''):
+        checksum.update(chunk)
+    return checksum.digest()
+
+# Below are the tables which records can be added to or removed from by add_record, add_records_bulk and remove_record
+# The SQL for each table is written out in full, so the table name cannot be used for SQL injection
+# Each table always uses the same SQL text, which lets sqlite3 reuse the prepared statement instead of compiling it again
+_INSERT_SQL = {
+    'lyrics': 'INSERT INTO lyrics (song_title, lyrics) VALUES (?, ?)',
+    'music_scores': 'INSERT INTO music_scores (song_title, score) VALUES (?, ?)',
+    'musical_recordings': 'INSERT INTO musical_recordings (song_title, recording, checksum) VALUES (?, ?, ?)'
+}
+_DELETE_BY_ID = {
+    'lyrics': 'DELETE FROM lyrics WHERE id = ?',
+    'music_scores': 'DELETE FROM music_scores WHERE id = ?',
+    'musical_recordings': 'DELETE FROM musical_recordings WHERE id = ?'
+}
+
+# Below is a function to create the tuple of values for the INSERT statement of a table from a data dictionary
+# The values are in the same order as the columns in _INSERT_SQL
+# For musical recordings the checksum of the recording data is computed and added to the values
+# This is to ensure data integrity and prevent data tampering in the database
+def _insert_values(table, data):
+    if table == 'lyrics':
+        return (data['song_title'], data['lyrics'])
+    if table == 'music_scores':
+        return (data['song_title'], data['score'])
+    return (data['song_title'], data['recording'], compute_checksum(data['recording']))
+
+# Below is a buffer of modification history entries which have not been written to the database yet
+# Each entry is a (table name, action, record ID) tuple added by add_record, add_records_bulk or remove_record
+# The flush_history function writes every buffered entry with one executemany call and commits the transaction
+# This means a batch of changes is logged with one INSERT statement and one commit instead of one of each per record
+_pending_history = []
+
+def flush_history():
+    if not _pending_history:
+        return
+    cursor.executemany('INSERT INTO modification_history (table_name, action, record_id) VALUES (?, ?, ?)', _pending_history)
+    conn.commit()
+    _pending_history.clear()
+
+# Below registers flush_history to run when the script ends, so buffered history is not lost if a caller forgets to flush it
+# It is registered after db.py registers close_conn, and atexit runs the most recently registered function first, so the history is written before the connection closes
+atexit.register(flush_history)
 
 # Below is a function to create a record to the database and log the modification to the database (admin privilege only)
-# The function will take the username, password, table name, and data as input
-# The function will authenticate the user based on the provided username and password
+# The function will take the role returned by Login.authenticate_user, the table name, and data as input
+# The user is authenticated once by the caller, so the password is not hashed again for every record
 # The function will check if the user is an admin to add the record to the database
-def add_record(username, password, table, data):
-    role = Login.authenticate_user(username, password)
+# The commit argument can be set to False so the caller can commit several records in a single transaction with flush_history()
+def add_record(role, table, data, commit=True):
     if role != 'admin':
         print("Permission Denied: Only administrators can create records.")
         return
+    if table not in _INSERT_SQL:
+        print(f"Invalid table: {table}.")
+        return
 
-    placeholders = ', '.join(['?' for _ in data])     # This will create placeholders for the values to be inserted
-    columns = ', '.join(data.keys())                  # This will create columns for the values to be inserted
-    values = tuple(data.values())                     # This will create a tuple of values to be inserted
+# Below the cursor will execute the insert query for the table to add the record to the database
+# The modification is added to the history buffer, and flush_history() will log it and commit the changes to the database
+    cursor.execute(_INSERT_SQL[table], _insert_values(table, data))
+    _pending_history.append((table, 'INSERT', cursor.lastrowid))
+    if commit:
+        flush_history()
+    print(f"Record added to {table}.")
+
+# Below is a function to create several records in the same table with a single authentication (admin privilege only)
+# The function will take the role of the authenticated user, the table name, and a list of data dictionaries with the same columns as input
+# Every record is inserted in the same transaction, so the changes are committed once rather than once per record
+# The record IDs are added to the history buffer as the records are inserted, and flush_history() logs them all at once
+def add_records_bulk(role, table, rows, commit=True):
+    if role != 'admin':
+        print("Permission Denied: Only administrators can create records.")
+        return
+    if table not in _INSERT_SQL:
+        print(f"Invalid table: {table}.")
+        return
 
-# Below checks if the table is 'musical_recordings' and computes the checksum of the recording data
-# The checksum is added to the columns and values to be inserted into the database
-# This is to ensure data integrity and prevent data tampering in the database
-# The cursor will execute the insert query to add the record to the database
-# The conn.commit() will commit the changes to the database
-    if table == 'musical_recordings':
-        checksum = compute_checksum(data['recording'])
-        columns += ', checksum'
-        placeholders += ', ?'
-        values += (checksum,)
-
-    cursor.execute(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', values)
-    record_id = cursor.lastrowid
-    cursor.execute('INSERT INTO modification_history (table_name, action, record_id) VALUES (?, ?, ?)',
-                   (table, 'INSERT', record_id))
-    conn.commit()
-    print(f"Record added to {table}. Timestamp: {datetime.now()}")
+    for data in rows:
+        cursor.execute(_INSERT_SQL[table], _insert_values(table, data))
+        _pending_history.append((table, 'INSERT', cursor.lastrowid))
+    if commit:
+        flush_history()
+    print(f"{len(rows)} records added to {table}.")
 
 # Below is a function to remove a record and log the modification to the database (admin privilege only)
-# The function will take the username, password, table name, and record ID as input
-# The function will authenticate the user based on the provided username and password
+# The function will take the role returned by Login.authenticate_user, the table name, and record ID as input
 # The function will check if the user is an admin to delete the record from the database
 # The cursor will execute the delete query to remove the record from the database
-# The cursor will execute the insert query to log the modification history of the record in the database
+# The deletion is added to the history buffer, and flush_history() will log it and commit the changes to the database
 # This will be used by the admin user to track the modification history of records in the database
-# There will also be a datetime stamp to track the time of the modification
-# The conn.commit() will commit the changes to the database
-def remove_record(username, password, table, record_id):
-    role = Login.authenticate_user(username, password)
+# SQLite stamps the time of the modification with CURRENT_TIMESTAMP, so it does not need to be generated in Python
+def remove_record(role, table, record_id):
     if role != 'admin':
         print("Permission Denied: Only administrators can delete records.")
         return
+    if table not in _DELETE_BY_ID:
+        print(f"Invalid table: {table}.")
+        return
 
-    cursor.execute(f'DELETE FROM {table} WHERE id = ?', (record_id,))
-    cursor.execute('INSERT INTO modification_history (table_name, action, record_id) VALUES (?, ?, ?)',
-                   (table, 'DELETE', record_id))
-    conn.commit()
-    print(f"Record deleted from {table}. Timestamp: {datetime.now()}")
+    cursor.execute(_DELETE_BY_ID[table], (record_id,))
+    _pending_history.append((table, 'DELETE', record_id))
+    flush_history()
+    print(f"Record deleted from {table}.")
 
 # Below is a function to register a user account in the database
 # The function will prompt the user to enter their first name, last name, date of birth, email, username, password, and role
@@ -228,6 +299,7 @@ def remove_record(username, password, table, record_id):
 # If the email and username do not exist, the function will add the user to the database
 # When the user has input the details, a prompt will ask the user to enter the role (user/admin)
 # For the purpose of this script, this is to allow admin privileges and display the CRUD operations
+# The function will return the username, password, and role, or None for each if the registration failed
 def register_user():
     first_name = input("Enter first name: ")
     last_name = input("Enter last name: ")
@@ -240,24 +312,26 @@ def register_user():
     cursor.execute('SELECT id FROM accounts WHERE email = ?', (email,))
     if cursor.fetchone():
         print(f"Registration failed: An account with email {email} already exists.")
-        return None, None
+        return None, None, None
 
     cursor.execute('SELECT id FROM users WHERE username = ?', (username,))
     if cursor.fetchone():
         print(f"Registration failed: A user with username {username} already exists.")
-        return None, None
+        return None, None, None
 
     account = Account(first_name, last_name, date_of_birth, email)
     account_id = account.save()
     Login.add_user(account_id, username, password, role)
     print(f"User {username} registered successfully.")
-    return username, password
+    return username, password, role
 
 # Below is a function to clean up the database by deleting the admin and user accounts from the database
 # This is to remove the test data from the database and prevent duplication of data
 # The cursor will execute the delete query to remove the admin and user accounts from the database
+# Users linked to the sample accounts are removed as well, as foreign keys are enforced and the accounts could not be deleted otherwise
 def clean_up():
-    cursor.execute('DELETE FROM users WHERE username IN ("admin", "user")')
+    cursor.execute('DELETE FROM users WHERE username IN ("admin", "user") '
+                   'OR account_id IN (SELECT id FROM accounts WHERE email IN ("admin@example.com", "user@example.com"))')
     cursor.execute('DELETE FROM accounts WHERE email IN ("admin@example.com", "user@example.com")')
     conn.commit()
 
@@ -265,7 +339,8 @@ def clean_up():
 # The function will add sample songs with lyrics, music scores, and musical recordings to the database
 # This is to prevent the database from being empty and having to manually add data into the database
 # Further data can be input into the database by the admin user in the records.py script
-def add_sample_songs(username, password):
+# The role of the already authenticated user is passed through to each insert instead of the username and password
+def add_sample_songs(role):
     songs = [
         ('Song 1', 'Lyrics of Song 1', b'PDF_BINARY_DATA_1', b'MP3_BINARY_DATA_1'),
         ('Song 2', 'Lyrics of Song 2', b'PDF_BINARY_DATA_2', b'MP3_BINARY_DATA_2'),
@@ -274,50 +349,73 @@ def add_sample_songs(username, password):
         ('Song 5', 'Lyrics of Song 5', b'PDF_BINARY_DATA_5', b'MP3_BINARY_DATA_5')
     ]
 
-# Below will add the sample songs to the database by calling the add_record function
-# The add_record function will add the sample songs to the lyrics, music_scores, and musical_recordings tables in the database
-# The add_record function will also log the modification history of the records in the modification_history table in the database
-    for song in songs:
-        add_record(username, password, 'lyrics', {'song_title': song[0], 'lyrics': song[1]})
-        add_record(username, password, 'music_scores', {'song_title': song[0], 'score': song[2]})
-        add_record(username, password, 'musical_recordings', {'song_title': song[0], 'recording': song[3]})
+# Below will add the sample songs to the database by calling the add_records_bulk function
+# The add_records_bulk function will add the sample songs to the lyrics, music_scores, and musical_recordings tables in the database
+# The add_records_bulk function will also log the modification history of the records in the modification_history table in the database
+# All three tables are filled in the same transaction, and flush_history() logs every insert and commits once at the end
+# ANALYZE is run after the bulk load so the query planner has up to date statistics for the song title indexes
+    add_records_bulk(role, 'lyrics', [{'song_title': song[0], 'lyrics': song[1]} for song in songs], commit=False)
+    add_records_bulk(role, 'music_scores', [{'song_title': song[0], 'score': song[2]} for song in songs], commit=False)
+    add_records_bulk(role, 'musical_recordings', [{'song_title': song[0], 'recording': song[3]} for song in songs], commit=False)
+    flush_history()
+    conn.execute('ANALYZE')
 
 # Below is a function to list songs with their modification history in the database
 # The function will join the musical_recordings and modification_history tables 
+# The query starts from the modification_history rows for musical_recordings, found through the idx_modhist_table_record index
 # This will display the song title, timestamp, action, and modified timestamp of the records in the database
 # This will be used by the admin user to track the modification history of records in the database
-# The cursor will execute the select query to fetch the song title, timestamp, action, and modified timestamp of the records
+# A read-only connection from the pool will execute the select query to fetch the song title, timestamp, action, and modified timestamp of the records
 def list_songs_with_history():
-    cursor.execute('''
-    SELECT m.song_title, m.timestamp, h.action, h.timestamp 
-    FROM musical_recordings m 
-    JOIN modification_history h ON m.id = h.record_id 
-    WHERE h.table_name = 'musical_recordings'
-    ''')
-    songs = cursor.fetchall()
+    with get_ro_conn() as ro_conn:
+        songs = ro_conn.execute('''
+        SELECT m.song_title, m.timestamp, h.action, h.timestamp 
+        FROM modification_history h 
+        JOIN musical_recordings m ON m.id = h.record_id 
+        WHERE h.table_name = 'musical_recordings'
+        ''').fetchall()
     for song in songs:
         print(f"Title: {song[0]}, Added on: {song[1]}, Action: {song[2]}, Modified on: {song[3]}")
 
+# Below is a function to verify the checksum of every musical recording in the database (admin privilege only)
+# The recordings are read in batches of 64 rows and each batch is hashed in a thread pool
+# Hashlib releases the GIL while it hashes large data, so the recordings are hashed on several CPU cores at once
+# The function will return the IDs of the recordings whose stored checksum no longer matches the recording data
+def verify_all_checksums(role):
+    if role != 'admin':
+        print("Permission Denied: Only administrators can verify records.")
+        return None
+
+    total = 0
+    mismatched = []
+    cursor.execute('SELECT id, recording, checksum FROM musical_recordings')
+    with ThreadPoolExecutor() as executor:
+        while rows := cursor.fetchmany(64):
+            checksums = executor.map(compute_checksum, [row[1] for row in rows])
+            mismatched += [row[0] for row, checksum in zip(rows, checksums) if checksum != row[2]]
+            total += len(rows)
+    print(f"{total - len(mismatched)} of {total} recordings passed the checksum check.")
+    return mismatched
+
 # Below is the main function to execute the registration process 
 # The main function will prompt the user to enter details to register an account
-# The main function will authenticate the user based on the provided username and password
+# The role entered during registration is used directly, so the new password does not need to be hashed again to log in
 # If the user is admin, the sample list will be displayed along with the modification history 
+# The admin will also see whether every recording still matches its checksum
 # If the user is a regular user, the user will not be able to view the modification history 
 def main():
     clean_up()
     print("Please enter details to register an account...")
-    username, password = register_user()
+    username, password, role = register_user()
 
     if username and password:
-        role = Login.authenticate_user(username, password)
         if role == 'admin':
-            add_sample_songs(username, password)
+            add_sample_songs(role)
             list_songs_with_history()
+            verify_all_checksums(role)
 
 # Below will execute the main function when the script is run
+# Any buffered modification history is logged and the connection is closed by the atexit functions when the script ends
 if __name__ == "__main__":
     main()
 
-# Below will close the connection to the database
-conn.close()
-
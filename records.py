@@ -5,136 +5,167 @@ as well as create, delete, and add various artifacts in the library.
 """
 
 import hashlib                        # Hashlib library for hashing functions          
-import sqlite3                        # SQLite library for database operations
+import io                             # Io library for holding the messages of a batch import in memory
+import logging                        # Logging library for the messages shown when artifacts are created or deleted
+import sys                            # Sys library for writing the view output to the console in batches
 from datetime import datetime         # Datetime library for timestamping records
+from db import get_conn               # Shared SQLite database connection, opened on first use
+from login import authenticate_user   # Authentication is shared with login.py rather than duplicated here
 
-# Below connects to the SQLite database and creates a cursor object to execute SQL queries
-conn = sqlite3.connect('music_library.db')
-cursor = conn.cursor()
-
-# Below is a function to authenticate user based on the provided username and password
-# The function will query the users table in the database to retrieve the stored hash, salt, and role for the provided username
-def get_user_credentials(username):
-    cursor.execute('SELECT password_hash, salt, role FROM users WHERE username = ?', (username,))
-    return cursor.fetchone()
-
-# Below will hash the password for security purposes
-def hash_password(password, salt):
-    return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, 100000)
-
-# Below will authenticate the user based on the username and password entered
-def authenticate_user(username, password):
-    user = get_user_credentials(username)
-
-# If the user is in the database, the password will be hashed  
-# The hashed password will be compared with the stored hash in the database
-    if user:
-        stored_hash, salt, role = user
-        test_hash = hash_password(password, salt) 
-
-# If the hashed password matches the stored hash, the user will be authenticated and granted access to the library                                                     
-        if test_hash == stored_hash:
-            return role                           
-    
-    return None
+# The connection is shared with login.py through get_conn(), so the database is only opened once
+# Every view, create and delete function below calls get_conn() when it runs, so importing this module does not open the database
+
+# Below sets up the logger used for the messages shown when artifacts are created, deleted or imported
+# The messages are written to the console with just their text, the same as print(), and are not passed on to the root logger
+# Unlike print(), the handler the messages go through can be swapped, which main_batch uses to hold them in memory and write them once
+# The message arguments are passed separately, so the text is only formatted if the message is actually written
+log = logging.getLogger('records')
+log.setLevel(logging.INFO)
+log.propagate = False
+_console_handler = logging.StreamHandler(sys.stdout)
+_console_handler.setFormatter(logging.Formatter('%(message)s'))
+log.addHandler(_console_handler)
+
+# Below is how many rows fetchmany() returns at a time when the view functions read a table
+_FETCH_ROWS = 1000
+
+# Below are the SQL statements used by the functions in this module, kept as constants so each one is prepared once
+# sqlite3 caches prepared statements by their SQL text, so every later call reuses the compiled statement
+_SQL_SELECT_LYRICS = 'SELECT * FROM lyrics'
+_SQL_SELECT_MUSIC_SCORES = 'SELECT * FROM music_scores'
+_SQL_SELECT_MUSICAL_RECORDINGS = 'SELECT * FROM musical_recordings'
+_SQL_INSERT_LYRICS = 'INSERT INTO lyrics (song_title, lyrics) VALUES (?, ?)'
+_SQL_INSERT_MUSIC_SCORE = 'INSERT INTO music_scores (song_title, score) VALUES (?, ?)'
+_SQL_INSERT_MUSICAL_RECORDING = 'INSERT INTO musical_recordings (song_title, recording, checksum) VALUES (?, ?, ?)'
+_SQL_INSERT_MUSICAL_RECORDING_BLOB = 'INSERT INTO musical_recordings (song_title, recording, checksum) VALUES (?, zeroblob(?), zeroblob(32))'
+_SQL_DELETE_LYRICS = 'DELETE FROM lyrics WHERE song_title = ?'
+_SQL_DELETE_MUSIC_SCORE = 'DELETE FROM music_scores WHERE song_title = ?'
+_SQL_DELETE_MUSICAL_RECORDING = 'DELETE FROM musical_recordings WHERE song_title = ?'
+
+# Below is the size of each piece of a recording written to the database and hashed at a time (64 KiB)
+_BLOB_CHUNK_SIZE = 64 * 1024
+
+# Below is the format of the date and time stamp printed when an artifact is created or deleted
+# The timestamp stored in each table comes from its CURRENT_TIMESTAMP default, so every table is stamped the same way (UTC)
+_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Below is the name of each artifact type used in the messages of a batch import
+_ARTIFACT_NAMES = {'lyrics': 'Lyrics', 'score': 'Music score', 'recording': 'Musical recording'}
 
 # Below is a function to view lyrics from the lyrics table in the database
 # The cursor will execute the SQL query to select all data from the lyrics table
-# The select query will fetch all the rows from the table and display the data in the console
+# The rows are fetched in batches of _FETCH_ROWS and each batch is joined into one string and written to the console with a single write() call
+# writelines() would still call write() once per line, which flushes a line-buffered console for every row
+# This keeps memory bounded for a large table without printing, and writing to the console, once per row
 # The function will print the ID, Title, and Lyrics of each record in the lyrics table
 def view_lyrics():
-    conn = sqlite3.connect('music_library.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM lyrics')
-    rows = cursor.fetchall()
-    conn.close()
-    
-    for row in rows:
-        print(f"ID: {row[0]}, Title: {row[1]}, Lyrics: {row[2]}")
+    cursor = get_conn().execute(_SQL_SELECT_LYRICS)
+    while rows := cursor.fetchmany(_FETCH_ROWS):
+        sys.stdout.write("".join(f"ID: {row[0]}, Title: {row[1]}, Lyrics: {row[2]}\n" for row in rows))
 
 # Below is a function to view music scores from the music_scores table in the database
 # The cursor will execute the SQL query to select all data from the music_scores table
-# The select query will fetch all the rows from the table and display the data in the console
+# The rows are fetched in batches of _FETCH_ROWS and each batch is joined into one string and written to the console with a single write() call
 # The function will print the ID, Title, and Score of each record in the music_scores table
 def view_music_scores():
-    conn = sqlite3.connect('music_library.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM lyrics')
-    for row in cursor.fetchall():
-        print(f"ID: {row[0]}, Title: {row[1]}, Lyrics: {row[2]}") 
+    cursor = get_conn().execute(_SQL_SELECT_MUSIC_SCORES)
+    while rows := cursor.fetchmany(_FETCH_ROWS):
+        sys.stdout.write("".join(f"ID: {row[0]}, Title: {row[1]}, Score: {row[2]}\n" for row in rows))
 
 # Below is a function to view musical recordings from the musical_recordings table in the database
 # The cursor will execute the SQL query to select all data from the musical_recordings table
-# The select query will fetch all the rows from the table and display the data in the console
+# The rows are fetched in batches of _FETCH_ROWS and each batch is joined into one string and written to the console with a single write() call
 # The function will print the ID, Title, Recording, and Checksum of each record in the musical_recordings table
+# The checksum is stored as raw bytes, so it is only turned into hexadecimal here when it is printed
 def view_musical_recordings():
-    conn = sqlite3.connect('music_library.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM musical_recordings')
-for row in cursor.fetchall():
-        print(f"ID: {row[0]}, Title: {row[1]}, Lyrics: {row[2]}") 
+    cursor = get_conn().execute(_SQL_SELECT_MUSICAL_RECORDINGS)
+    while rows := cursor.fetchmany(_FETCH_ROWS):
+        sys.stdout.write("".join(f"ID: {row[0]}, Title: {row[1]}, Recording: {row[2]}, Checksum: {row[3].hex()}\n" for row in rows))
 
 # Below is a function to create lyrics in the lyrics table of the database
 # The function will insert the provided song title and lyrics into the lyrics table
 # The cursor will execute the SQL query to insert the song title and lyrics into the lyrics table
-# The function will commit the changes to the database and close the connection
+# The insert runs inside 'with conn:', which commits the change or rolls it back if the insert fails
+# The date and time stamp for the message is formatted once, printed, and returned so the caller can reuse it
 def create_lyrics(song_title, lyrics):
-    conn = sqlite3.connect('music_library.db')
-    cursor = conn.cursor()
-    cursor.execute('INSERT INTO lyrics (song_title, lyrics, timestamp) VALUES (?, ?, ?)', (song_title, lyrics, datetime.now))
-    conn.commit()
-    conn.close() 
-    print(f"Lyrics for '{song_title}' added successfully at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}.")
+    ts = datetime.now().strftime(_TIMESTAMP_FORMAT)
+    conn = get_conn()
+    with conn:
+        conn.execute(_SQL_INSERT_LYRICS, (song_title, lyrics))
+    log.info("Lyrics for '%s' added successfully at %s.", song_title, ts)
+    return ts
 
 # Below is a function to add music scores in the music_scores table of the database
 # The function will insert the provided song title and score into the music_scores table
 # The cursor will execute the SQL query to insert the song title and score into the music_scores table
-# The function will commit the changes to the database and close the connection
+# The insert runs inside 'with conn:', which commits the change or rolls it back if the insert fails
 def add_music_score(song_title, score):
-    conn = sqlite3.connect('music_library.db')
-    cursor = conn.cursor()
-    cursor.execute('INSERT INTO music_scores (song_title, score) VALUES (?, ?)', (song_title, score))
-    conn.commit()
-    conn.close()
-    print(f"Music score for '{song_title}' added successfully at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}.")
+    ts = datetime.now().strftime(_TIMESTAMP_FORMAT)
+    conn = get_conn()
+    with conn:
+        conn.execute(_SQL_INSERT_MUSIC_SCORE, (song_title, score))
+    log.info("Music score for '%s' added successfully at %s.", song_title, ts)
+    return ts
+
+# Below is an internal function which inserts one musical recording and calculates its checksum in a single pass over the data
+# The row is inserted with empty BLOBs of the right size (zeroblob) for the recording and its 32-byte checksum, and both are then filled in through SQLite's incremental blob I/O
+# Each 64 KiB piece of the recording is written to the BLOB and fed to the SHA-256 hash in the same loop, so the data is only walked once
+# hashlib.sha256 is OpenSSL's implementation, which uses the CPU's SHA instructions where available
+# Once every piece is written, the raw 32-byte digest is written into the checksum BLOB in place, as an UPDATE of the row would write the whole recording a second time
+# The caller commits, so the row is never seen without its checksum
+# Incremental blob I/O (Connection.blobopen) needs Python 3.11+, so older versions hash the recording and insert it with a single INSERT instead
+def _hash_and_store(cur, song_title, recording):
+    if not hasattr(cur.connection, 'blobopen'):
+        cur.execute(_SQL_INSERT_MUSICAL_RECORDING, (song_title, recording, hashlib.sha256(recording).digest()))
+        return
+    data = memoryview(recording)
+    sha256 = hashlib.sha256()
+    cur.execute(_SQL_INSERT_MUSICAL_RECORDING_BLOB, (song_title, len(data)))
+    record_id = cur.lastrowid
+    with cur.connection.blobopen('musical_recordings', 'recording', record_id) as blob:
+        for start in range(0, len(data), _BLOB_CHUNK_SIZE):
+            chunk = data[start:start + _BLOB_CHUNK_SIZE]
+            blob.write(chunk)
+            sha256.update(chunk)
+    with cur.connection.blobopen('musical_recordings', 'checksum', record_id) as blob:
+        blob.write(sha256.digest())
 
 # Below is a function to add musical recordings in the musical_recordings table of the database
 # The function will insert the provided song title and recording into the musical_recordings table
 # The cursor will execute the SQL query to insert the song title and recording into the musical_recordings table
-# This function will also calculate the checksum of the recording using the hashlib library
+# The recording is stored and its checksum calculated by _hash_and_store, inside 'with conn:' so both are committed together
 # The function will also keep a date and time stamp of when the recording was added
 def add_musical_recording(song_title, recording):
-    checksum = hashlib.sha256(recording).hexdigest()
-    conn = sqlite3.connect('music_library.db')
-    cursor = conn.cursor()
-    cursor.execute('INSERT INTO musical_recordings (song_title, recording, checksum) VALUES (?, ?, ?)', (song_title, recording, checksum))
-    conn.commit()
-    conn.close()
-    print(f"Musical recording for '{song_title}' created successfully at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}.")
+    ts = datetime.now().strftime(_TIMESTAMP_FORMAT)
+    conn = get_conn()
+    with conn:
+        _hash_and_store(conn.cursor(), song_title, recording)
+    log.info("Musical recording for '%s' created successfully at %s.", song_title, ts)
+    return ts
 
 # Below is a function to delete lyrics from the lyrics table in the database (admin only)
 # The function will delete the lyrics for the provided song title from the lyrics table
 # The cursor will execute the SQL query to delete the lyrics based on the song title
 # The function will also keep a date and time stamp of when the lyrics were deleted
 def delete_lyrics(song_title):
-    conn = sqlite3.connect('music_library.db')
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM lyrics WHERE song_title = ?', (song_title,))
-    conn.commit()
-    conn.close()
-    print(f"Lyrics for '{song_title}' deleted successfully at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}.")
+    ts = datetime.now().strftime(_TIMESTAMP_FORMAT)
+    conn = get_conn()
+    with conn:
+        conn.execute(_SQL_DELETE_LYRICS, (song_title,))
+    log.info("Lyrics for '%s' deleted successfully at %s.", song_title, ts)
+    return ts
 
 # Below is a function to delete music scores from the music_scores table in the database (admin only)
 # The function will delete the music score for the provided song title from the music_scores table
 # The cursor will execute the SQL query to delete the music score based on the song title
 # The function will also keep a date and time stamp of when the music score was deleted
 def delete_music_score(song_title):
-    conn = sqlite3.connect('music_library.db')
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM music_scores WHERE song_title = ?', (song_title,))
-    conn.commit()
-    conn.close()
-    print(f"Music score for '{song_title}' deleted successfully at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}.")
+    ts = datetime.now().strftime(_TIMESTAMP_FORMAT)
+    conn = get_conn()
+    with conn:
+        conn.execute(_SQL_DELETE_MUSIC_SCORE, (song_title,))
+    log.info("Music score for '%s' deleted successfully at %s.", song_title, ts)
+    return ts
 
 
 # # Below is a function to delete musical recordings from the musical_recordings table in the database (admin only)
@@ -142,12 +173,138 @@ def delete_music_score(song_title):
 # The cursor will execute the SQL query to delete the musical recording based on the song title
 # The function will also keep a date and time stamp of when the musical recording was deleted
 def delete_musical_recording(song_title):
-    conn = sqlite3.connect('music_library.db')
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM musical_recordings WHERE song_title = ?', (song_title,))
-    conn.commit()
-    conn.close()
-    print(f"Musical recording for '{song_title}' deleted successfully at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}.")
+    ts = datetime.now().strftime(_TIMESTAMP_FORMAT)
+    conn = get_conn()
+    with conn:
+        conn.execute(_SQL_DELETE_MUSICAL_RECORDING, (song_title,))
+    log.info("Musical recording for '%s' deleted successfully at %s.", song_title, ts)
+    return ts
+
+# Below is the SQL statement which deletes each type of artifact by its song title, used by delete_many
+_DELETE_SQL_BY_TYPE = {'lyrics': _SQL_DELETE_LYRICS, 'score': _SQL_DELETE_MUSIC_SCORE, 'recording': _SQL_DELETE_MUSICAL_RECORDING}
+
+# Below is an internal function which deletes every artifact of one type with one of the given song titles, and returns how many were deleted
+# executemany() runs the same prepared delete for every song title, and the song title indexes created in main.py let each delete avoid a table scan
+# It does not commit, so delete_many and main_batch decide the transaction
+def _delete_many(cur, artifact_type, song_titles):
+    return cur.executemany(_DELETE_SQL_BY_TYPE[artifact_type], ((song_title,) for song_title in song_titles)).rowcount
+
+# Below is a function to delete many artifacts of one type at once (admin privilege only)
+# The role of the already authenticated user is passed in, the same as the record functions in main.py
+# The artifact type can be lyrics, score or recording, and all the deletes run inside one 'with conn:' block so they are committed together
+def delete_many(role, artifact_type, song_titles):
+    if role != 'admin':
+        log.error("Permission Denied: Only administrators can delete records.")
+        return None
+    if artifact_type not in _DELETE_SQL_BY_TYPE:
+        log.error("Invalid artifact type.")
+        return None
+    ts = datetime.now().strftime(_TIMESTAMP_FORMAT)
+    conn = get_conn()
+    with conn:
+        deleted = _delete_many(conn.cursor(), artifact_type, song_titles)
+    log.info("%s %s records deleted successfully at %s.", deleted, _ARTIFACT_NAMES[artifact_type].lower(), ts)
+    return ts
+
+# Below are the internal functions used by main_batch to insert many artifacts of one type at a time
+# Each one takes a cursor on the shared connection and a list of (song title, data) pairs, and does not commit, so the caller decides the transaction
+# executemany() runs the same prepared statement for every pair, instead of preparing and committing one insert per artifact
+# Recordings go through _hash_and_store one at a time instead, so each recording is hashed while it is written and goes through the WAL only once, the same as a single INSERT
+def _insert_lyrics(cur, rows):
+    cur.executemany(_SQL_INSERT_LYRICS, rows)
+
+def _insert_music_scores(cur, rows):
+    cur.executemany(_SQL_INSERT_MUSIC_SCORE, rows)
+
+def _insert_musical_recordings(cur, rows):
+    for song_title, recording in rows:
+        _hash_and_store(cur, song_title, recording)
+
+# Below is the insert function main_batch uses for each artifact type
+_INSERT_BY_TYPE = {'lyrics': _insert_lyrics, 'score': _insert_music_scores, 'recording': _insert_musical_recordings}
+
+# Below is the batch version of the main function, which imports or deletes many artifacts from a file in one go (admin only)
+# Each line of the file holds one command, the song title and the data, separated by tabs, for example 'create lyrics<TAB>Song 1<TAB>Lyrics of Song 1'
+# A delete command only has the song title, for example 'delete lyrics<TAB>Song 1'
+# The artifact type can be lyrics, score or recording, the same as in the interactive main function, and blank lines are skipped
+# Every line is checked before anything is written, so a file with an invalid line changes nothing
+# The commands are applied in the order they appear in the file, so a create followed by a delete of the same song leaves nothing behind
+# Consecutive lines with the same command and artifact type are grouped, and each group is written with one executemany() call
+# All the deletes and inserts run inside one 'with conn:' block, so the whole file is committed once, or rolled back if anything fails
+# The file is opened before the login prompts, so a missing or unreadable file is reported straight away
+# The function returns True if the file was applied, and False if it was not, which the script turns into its exit status
+def main_batch(path):
+    try:
+        batch_file = open(path, encoding='utf-8')
+    except OSError as error:
+        log.error("Invalid batch file: %s could not be opened (%s).", path, error.strerror)
+        return False
+
+    with batch_file:
+        print("Welcome to the Music Library Management System")
+        username = input("Enter username: ")
+        password = input("Enter password: ")
+        role = authenticate_user(username, password)
+
+        if role != 'admin':
+            print("Permission denied: Only an administrator can import library artifacts.")
+            return False
+
+# Below reads the commands from the file into runs of consecutive lines with the same action and artifact type
+# Each run is a list of [action, artifact type, items], where the items are song titles for a delete and (song title, data) pairs for a create
+# Recordings are encoded to bytes, the same as the recording data entered in the interactive main function
+# While the import runs, the messages are written to a string in memory instead of the console
+# When the import finishes or stops, everything held is written to the console with a single write
+        buffer = io.StringIO()
+        buffer_handler = logging.StreamHandler(buffer)
+        buffer_handler.setFormatter(_console_handler.formatter)
+        log.removeHandler(_console_handler)
+        log.addHandler(buffer_handler)
+        try:
+            runs = []
+            try:
+                for line_number, line in enumerate(batch_file, 1):
+                    line = line.rstrip('\n')
+                    if not line.strip():
+                        continue
+                    fields = line.split('\t', 2)
+                    action, _, artifact_type = fields[0].strip().lower().partition(' ')
+                    if artifact_type not in _INSERT_BY_TYPE or (action, len(fields)) not in (('create', 3), ('delete', 2)):
+                        log.error("Invalid command on line %s: %s", line_number, line)
+                        return False
+                    if not runs or runs[-1][:2] != [action, artifact_type]:
+                        runs.append([action, artifact_type, []])
+                    if action == 'delete':
+                        runs[-1][2].append(fields[1])
+                    else:
+                        data = fields[2].encode() if artifact_type == 'recording' else fields[2]
+                        runs[-1][2].append((fields[1], data))
+            except (OSError, UnicodeDecodeError) as error:
+                log.error("Invalid batch file: %s could not be read (%s).", path, error)
+                return False
+
+            ts = datetime.now().strftime(_TIMESTAMP_FORMAT)
+            conn = get_conn()
+            cursor = conn.cursor()
+            created = dict.fromkeys(_INSERT_BY_TYPE, 0)
+            deleted = {}
+            with conn:
+                for action, artifact_type, items in runs:
+                    if action == 'delete':
+                        deleted[artifact_type] = deleted.get(artifact_type, 0) + _delete_many(cursor, artifact_type, items)
+                    else:
+                        _INSERT_BY_TYPE[artifact_type](cursor, items)
+                        created[artifact_type] += len(items)
+            for artifact_type, count in deleted.items():
+                log.info("%s %s records deleted at %s.", count, _ARTIFACT_NAMES[artifact_type].lower(), ts)
+            log.info("Imported %s lyrics, %s music scores and %s musical recordings at %s.",
+                     created['lyrics'], created['score'], created['recording'], ts)
+            return True
+        finally:
+            log.removeHandler(buffer_handler)
+            log.addHandler(_console_handler)
+            sys.stdout.write(buffer.getvalue())
+            sys.stdout.flush()
 
 # Below is the main function to execute the login process.
 # The user will be prompted to enter their username and password.
@@ -202,16 +359,16 @@ def main():
 # The create_lyrics, add_music_score, and add_musical_recording functions will be called based on the artifact type          
             if artifact_type == 'lyrics':
                 lyrics = input("Enter lyrics: ")
-                create_lyrics(song_title, lyrics)
-                print(f"Lyrics for '{song_title}' added at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}.")
+                ts = create_lyrics(song_title, lyrics)
+                log.info("Lyrics for '%s' added at %s.", song_title, ts)
             elif artifact_type == 'score':
                 score = input("Enter music score data (as text): ")
-                add_music_score(song_title, score)
-                print(f"Music score for '{song_title}' added at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}.")
+                ts = add_music_score(song_title, score)
+                log.info("Music score for '%s' added at %s.", song_title, ts)
             elif artifact_type == 'recording':
                 recording = input("Enter musical recording data (as text): ").encode()
-                add_musical_recording(song_title, recording)
-                print(f"Musical recording for '{song_title}' added at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}.")
+                ts = add_musical_recording(song_title, recording)
+                log.info("Musical recording for '%s' added at %s.", song_title, ts)
             else:
                 print("Invalid artifact type.")
  
@@ -229,14 +386,14 @@ def main():
 # Below are conditional statements to check the artifact type and call the appropriate function to delete the artifact
 # The delete_lyrics, delete_music_score, and delete_musical_recording functions will be called based on the artifact type          
             if artifact_type == 'lyrics':
-                delete_lyrics(song_title)
-                print(f"Lyrics for '{song_title}' deleted at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}.")
+                ts = delete_lyrics(song_title)
+                log.info("Lyrics for '%s' deleted at %s.", song_title, ts)
             elif artifact_type == 'score':
-                delete_music_score(song_title)
-                print(f"Music score for '{song_title}' deleted at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}.")
+                ts = delete_music_score(song_title)
+                log.info("Music score for '%s' deleted at %s.", song_title, ts)
             elif artifact_type == 'recording':
-                delete_musical_recording(song_title)
-                print(f"Musical recording for '{song_title}' deleted at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}.")
+                ts = delete_musical_recording(song_title)
+                log.info("Musical recording for '%s' deleted at %s.", song_title, ts)
             else:
                 print("Invalid artifact type.")
         
@@ -245,6 +402,11 @@ def main():
     else:
         print("Unknown role.")
 
+# Below runs the batch import when a file of commands is given on the command line, for example 'python records.py commands.txt'
+# The script exits with status 1 if the import was not applied, so scripts running a bulk import can detect the failure
+# Otherwise the interactive main function is run
 if __name__ == "__main__":
-    
-     main()
\ No newline at end of file
+    if len(sys.argv) > 1:
+        sys.exit(0 if main_batch(sys.argv[1]) else 1)
+    else:
+        main()